@@ -15,19 +15,61 @@ This script handles:
 
 import os
 import sys
-import glob
+import re
+import hmac
 import json
-import subprocess
-import tempfile
+import hashlib
+import functools
+import io
+import contextlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 try:
-    from Cryptodome.Protocol.KDF import HKDF
-    from Cryptodome.Hash import SHA256
-    CRYPTO_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    print("Warning: pycryptodome not available, UID-based key derivation disabled")
-    CRYPTO_AVAILABLE = False
+    ORJSON_AVAILABLE = False
+
+# Bambu Lab key derivation parameters
+BAMBU_KDF_SALT = bytes([0x9a,0x75,0x9c,0xf2,0xc4,0xf7,0xca,0xff,0x22,0x2c,0xb9,0x76,0x9b,0x41,0xbc,0x96])
+BAMBU_KDF_CONTEXT = b"RFID-A\0"
+BAMBU_KEY_COUNT = 16
+BAMBU_KEY_LENGTH = 6
+
+# The salt never changes, so its HMAC key schedule is computed once and copied per UID
+HKDF_EXTRACT = hmac.new(BAMBU_KDF_SALT, digestmod=hashlib.sha256)
+
+@functools.lru_cache(maxsize=4096)
+def derive_keys_for_uid(uid: bytes) -> Tuple[bytes, ...]:
+    """Derive the 16 Bambu Lab sector keys for a UID, cached for re-dumped tags."""
+    # HKDF-SHA256 (RFC 5869) extract: the salt-keyed HMAC is copied, not rebuilt
+    extract = HKDF_EXTRACT.copy()
+    extract.update(uid)
+    prk = extract.digest()
+    
+    # Expand to 16 keys of 6 bytes each
+    output_length = BAMBU_KEY_COUNT * BAMBU_KEY_LENGTH
+    keys_data = b''
+    block = b''
+    counter = 1
+    while len(keys_data) < output_length:
+        block = hmac.digest(prk, block + BAMBU_KDF_CONTEXT + bytes([counter]), 'sha256')
+        keys_data += block
+        counter += 1
+    
+    return tuple(keys_data[i:i + BAMBU_KEY_LENGTH] for i in range(0, output_length, BAMBU_KEY_LENGTH))
+
+def dump_json_bytes(data: Dict[str, Any]) -> bytes:
+    """Serialize to JSON indented by 2 spaces, using orjson if installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+# One key per line in .dic files: 12 hex characters = 6 bytes
+DIC_KEY_PATTERN = re.compile(r'[0-9A-Fa-f]{12}')
 
 class RFIDDecryptor:
     def __init__(self):
@@ -37,104 +79,76 @@ class RFIDDecryptor:
         self.BYTES_PER_BLOCK = 16
         self.KEY_LENGTH = 6
         
+        # Companion key file names, in order of preference
+        self.KEY_BIN_TEMPLATES = ("{base}-key.bin", "{uid}-key.bin", "hf-mf-{uid}-key.bin")
+        self.KEY_DIC_TEMPLATES = ("{base}.dic", "{uid}.dic", "hf-mf-{uid}-key.dic")
+        
+        # Import parse.py once instead of spawning an interpreter per dump
+        self.parser = self.load_parser()
+        
+    def load_parser(self, parse_script: str = 'parse.py'):
+        """Load parse.py from the working directory as a module."""
+        try:
+            spec = importlib.util.spec_from_file_location('parse', parse_script)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return module
+        except Exception as e:
+            print(f"Warning: could not load {parse_script}: {e}")
+            return None
+    
+    def key_file_candidates(self, templates: Tuple[str, ...], base: str, uid_hex: str,
+                            dir_entries: Set[str]) -> List[str]:
+        """Return the companion key file names that exist in a directory listing."""
+        names = [template.format(base=base, uid=uid_hex) for template in templates]
+        return [name for name in names if name in dir_entries]
+    
     def parse_decrypted_data_to_json(self, decrypted_data: bytes, uid: str, original_bin_path: str = None) -> Optional[Dict[str, Any]]:
         """Parse decrypted RFID data using parse.py and convert to JSON."""
+        if self.parser is None:
+            print("  Parse failed: parse.py could not be loaded")
+            return None
+        
         try:
-            # Create temporary file for decrypted data
-            with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as temp_file:
-                temp_file.write(decrypted_data)
-                temp_path = temp_file.name
-            
+            # Parse in-process with the already imported parse.py module
+            path_for_filename = original_bin_path if original_bin_path else f"{uid}.bin"
             try:
-                # Run parse.py on the decrypted data
-                result = subprocess.run([
-                    'python3', 'parse.py', temp_path
-                ], capture_output=True, text=True, cwd='.')
-                
-                if result.returncode != 0:
-                    print(f"  Parse failed: {result.stderr}")
-                    return None
-                
-                yaml_output = result.stdout.strip()
-                if not yaml_output:
-                    print("  No output from parse.py")
-                    return None
-                
-                # Convert YAML-like output to JSON using the same logic as local-json-generator.py
-                # Use original bin path if provided, otherwise use temp path
-                path_for_filename = original_bin_path if original_bin_path else temp_path
-                json_data = self.yaml_to_json(yaml_output, path_for_filename)
-                return json_data
-                
-            finally:
-                # Clean up temp file
-                os.unlink(temp_path)
+                tag = self.parser.Tag(Path(path_for_filename), decrypted_data)
+            except self.parser.TagLengthMismatchError as e:
+                print(f"  Parse failed: {e}")
+                return None
+            
+            # Build the JSON from the tag's fields directly, so free text (e.g. "#" or
+            # quotes in a filament name) comes through verbatim
+            return self.fields_to_json(tag.to_dict(), path_for_filename)
                 
         except Exception as e:
             print(f"  Error parsing decrypted data: {e}")
             return None
     
-    def yaml_to_json(self, yaml_output: str, filename: str) -> Dict[str, Any]:
-        """Convert YAML-like parse.py output to proper JSON format."""
-        lines = yaml_output.strip().split('\n')
+    def fields_to_json(self, fields: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        """Type parse.py's tag fields the way the decrypted JSON files store them."""
         data = {}
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if not line or line.startswith('#'):
-                i += 1
-                continue
-            
-            # Handle lines that start with "- " (YAML list items)  
-            if line.startswith('- '):
-                if ': ' in line or line.endswith(':'):  # Handle both "key: value" and "key:"
-                    remaining = line[2:]  # Remove "- " prefix
-                    
-                    if ': ' in remaining:
-                        key, value = remaining.split(': ', 1)
-                        key = key.strip()
-                        value = value.strip()
-                    elif remaining.endswith(':'):
-                        key = remaining[:-1].strip()  # Remove trailing colon
-                        value = ""
-                    else:
-                        i += 1
-                        continue
-                    
-                    # Handle nested temperatures section
-                    if key == 'temperatures' and (not value or value == ""):
-                        data['temperatures'] = {}
-                        i += 1
-                        # Look for indented temperature fields with "  - " prefix
-                        while i < len(lines) and lines[i].startswith('  - '):
-                            temp_line = lines[i][4:]  # Remove '  - '
-                            if ': ' in temp_line:
-                                temp_key, temp_val = temp_line.split(': ', 1)
-                                temp_key = temp_key.strip()
-                                temp_val = temp_val.strip()
-                                # Convert bed_temp_type to int
-                                if temp_key == 'bed_temp_type':
-                                    try:
-                                        temp_val = int(temp_val)
-                                    except ValueError:
-                                        pass  # Keep as string if conversion fails
-                                data['temperatures'][temp_key] = temp_val
-                            i += 1
-                        continue
-                    
-                    # Handle other fields
-                    if value.isdigit():
-                        data[key] = int(value)
-                    elif value.lower() == 'true':
-                        data[key] = True
-                    elif value.lower() == 'false':
-                        data[key] = False
-                    else:
-                        data[key] = value
-            
-            i += 1
+        for key, value in fields.items():
+            if isinstance(value, dict):
+                # Nested temperatures section: strings, apart from bed_temp_type
+                temperatures = data[key] = {}
+                for temp_key, temp_val in value.items():
+                    temp_val = temp_val.strip()
+                    # Convert bed_temp_type to int
+                    if temp_key == 'bed_temp_type':
+                        try:
+                            temp_val = int(temp_val)
+                        except ValueError:
+                            pass  # Keep as string if conversion fails
+                    temperatures[temp_key] = temp_val
+            elif isinstance(value, list):
+                # Warnings are recorded as an empty field, as in the existing JSON files
+                data[key] = ''
+            else:
+                # Plain digits become ints; no tag field is ever a boolean
+                value = value.strip()
+                data[key] = int(value) if value.isdigit() else value
         
         # Add filename for reference
         data['filename'] = os.path.basename(filename)
@@ -143,21 +157,8 @@ class RFIDDecryptor:
         
     def derive_bambu_keys(self, uid: bytes) -> List[bytes]:
         """Derive Bambu Lab RFID keys from UID using their KDF algorithm."""
-        if not CRYPTO_AVAILABLE:
-            print("Cannot derive keys: pycryptodome not available")
-            return []
-            
         try:
-            master = bytes([0x9a,0x75,0x9c,0xf2,0xc4,0xf7,0xca,0xff,0x22,0x2c,0xb9,0x76,0x9b,0x41,0xbc,0x96])
-            keys_data = HKDF(uid, 6, master, SHA256, 16, context=b"RFID-A\0")
-            
-            # Split into 6-byte keys
-            keys = []
-            for i in range(0, len(keys_data), self.KEY_LENGTH):
-                if i + self.KEY_LENGTH <= len(keys_data):
-                    keys.append(keys_data[i:i+self.KEY_LENGTH])
-            
-            return keys
+            return list(derive_keys_for_uid(bytes(uid)))
         except Exception as e:
             print(f"Error deriving keys from UID: {e}")
             return []
@@ -173,7 +174,7 @@ class RFIDDecryptor:
                 key_bytes = key_data[i:i+self.KEY_LENGTH]
                 
                 # Skip zero-padding keys
-                if key_bytes == b'\\x00' * self.KEY_LENGTH:
+                if not any(key_bytes):
                     continue
                     
                 if len(key_bytes) == self.KEY_LENGTH:
@@ -187,17 +188,13 @@ class RFIDDecryptor:
     def load_keys_from_dic(self, dic_path: str) -> List[bytes]:
         """Load keys from .dic dictionary file."""
         try:
-            keys = []
             with open(dic_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and len(line) == 12:  # 12 hex characters = 6 bytes
-                        try:
-                            key_bytes = bytes.fromhex(line)
-                            keys.append(key_bytes)
-                        except ValueError:
-                            continue  # Skip invalid hex lines
-            return keys
+                lines = f.read().splitlines()
+            
+            # Keep 12 hex character lines (6 bytes) and decode them with a single call
+            hex_keys = [line for line in map(str.strip, lines) if DIC_KEY_PATTERN.fullmatch(line)]
+            key_data = bytes.fromhex(''.join(hex_keys))
+            return [key_data[i:i+self.KEY_LENGTH] for i in range(0, len(key_data), self.KEY_LENGTH)]
         except Exception as e:
             print(f"Error loading keys from {dic_path}: {e}")
             return []
@@ -216,19 +213,18 @@ class RFIDDecryptor:
             # the actual MIFARE decryption if working with encrypted dumps.
             
             # For now, we'll assume the dumps are already decrypted and just
-            # validate the key format and return the data
+            # validate the key format and return the data. MIFARE Classic only
+            # uses CRYPTO-1 (48-bit keys) on the air interface, so there is no
+            # AES-wrapped sector to route through an AES library here.
             if len(key) == self.KEY_LENGTH and len(sector_data) > 0:
                 return sector_data
             return None
         except Exception as e:
             return None
     
-    def decrypt_dump(self, dump_path: str, keys: List[bytes]) -> Optional[bytes]:
-        """Decrypt an RFID dump using provided keys."""
+    def decrypt_dump(self, dump_data: bytes, keys: List[bytes], dump_path: str = "<memory>") -> Optional[bytes]:
+        """Decrypt an already loaded RFID dump using provided keys."""
         try:
-            with open(dump_path, 'rb') as f:
-                dump_data = f.read()
-            
             if len(dump_data) < 1024:  # MIFARE Classic 1K minimum
                 print(f"Warning: Dump file {dump_path} seems too small ({len(dump_data)} bytes)")
             
@@ -256,7 +252,7 @@ class RFIDDecryptor:
         try:
             print(f"Processing: {dump_path}")
             
-            # Load dump to extract UID
+            # Load dump once; UID extraction and decryption share the same bytes
             with open(dump_path, 'rb') as f:
                 dump_data = f.read()
             
@@ -284,33 +280,22 @@ class RFIDDecryptor:
             if not keys:
                 dump_dir = os.path.dirname(dump_path)
                 dump_basename = os.path.basename(dump_path).replace('.bin', '')
+                # One directory listing instead of a stat call per candidate
+                dir_entries = set(os.listdir(dump_dir or '.'))
                 
-                # Try .bin key file
-                key_bin_candidates = [
-                    os.path.join(dump_dir, f"{dump_basename}-key.bin"),
-                    os.path.join(dump_dir, f"{uid_hex}-key.bin"),
-                    os.path.join(dump_dir, f"hf-mf-{uid_hex}-key.bin")
-                ]
-                
-                for key_path in key_bin_candidates:
-                    if os.path.exists(key_path):
-                        keys = self.load_keys_from_bin(key_path)
-                        print(f"  Found companion key file: {key_path} ({len(keys)} keys)")
-                        break
+                # Try .bin key file, then .dic key file
+                for key_name in self.key_file_candidates(self.KEY_BIN_TEMPLATES, dump_basename, uid_hex, dir_entries):
+                    key_path = os.path.join(dump_dir, key_name)
+                    keys = self.load_keys_from_bin(key_path)
+                    print(f"  Found companion key file: {key_path} ({len(keys)} keys)")
+                    break
                 
-                # Try .dic key file
                 if not keys:
-                    key_dic_candidates = [
-                        os.path.join(dump_dir, f"{dump_basename}.dic"),
-                        os.path.join(dump_dir, f"{uid_hex}.dic"),
-                        os.path.join(dump_dir, f"hf-mf-{uid_hex}-key.dic")
-                    ]
-                    
-                    for key_path in key_dic_candidates:
-                        if os.path.exists(key_path):
-                            keys = self.load_keys_from_dic(key_path)
-                            print(f"  Found companion .dic file: {key_path} ({len(keys)} keys)")
-                            break
+                    for key_name in self.key_file_candidates(self.KEY_DIC_TEMPLATES, dump_basename, uid_hex, dir_entries):
+                        key_path = os.path.join(dump_dir, key_name)
+                        keys = self.load_keys_from_dic(key_path)
+                        print(f"  Found companion .dic file: {key_path} ({len(keys)} keys)")
+                        break
             
             # 3. Try UID-based key derivation (Bambu Lab)
             if not keys:
@@ -322,8 +307,11 @@ class RFIDDecryptor:
                 print(f"  No keys available for decryption")
                 return False
             
+            # Drop repeated keys (e.g. KeyA == KeyB) so each is only tried once
+            keys = list(dict.fromkeys(keys))
+            
             # Decrypt the dump
-            decrypted_data = self.decrypt_dump(dump_path, keys)
+            decrypted_data = self.decrypt_dump(dump_data, keys, dump_path)
             if not decrypted_data:
                 return False
             
@@ -337,8 +325,8 @@ class RFIDDecryptor:
             decrypted_json_path = dump_path.replace('.bin', '-decrypted.json')
             
             # Write decrypted JSON
-            with open(decrypted_json_path, 'w') as f:
-                json.dump(json_data, f, indent=2)
+            with open(decrypted_json_path, 'wb') as f:
+                f.write(dump_json_bytes(json_data))
             
             print(f"✅ Generated: {decrypted_json_path}")
             return True
@@ -347,20 +335,63 @@ class RFIDDecryptor:
             print(f"❌ Failed to process {dump_path}: {e}")
             return False
 
-def find_dumps_needing_decryption(directory: str, force_regenerate: bool = False) -> List[str]:
+# Each worker process builds its own decryptor (and parse.py import) on first use
+worker_decryptor = None
+
+def process_dump_worker(dump_path: str, key_source: Optional[str] = None) -> Tuple[bool, str]:
+    """Process a dump in a worker process, returning the result and its buffered output."""
+    global worker_decryptor
+    if worker_decryptor is None:
+        worker_decryptor = RFIDDecryptor()
+    
+    # Buffer output so logs from parallel workers don't interleave
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        success = worker_decryptor.process_dump_file(dump_path, key_source)
+    return success, output.getvalue()
+
+def iter_dump_files(directory: str) -> Iterator[str]:
+    """Yield dump .bin files below directory, skipping key files and hidden entries."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_dump_files(entry.path)
+            elif entry.name.endswith('.bin') and 'key' not in entry.name.lower():
+                yield entry.path
+
+def is_decrypted_json_stale(decrypted_json_file: str, dump_file: str) -> bool:
+    """Check if a decrypted JSON file is older than its dump or the key files beside it."""
+    try:
+        json_mtime = os.stat(decrypted_json_file).st_mtime
+        if os.stat(dump_file).st_mtime > json_mtime:
+            return True
+        
+        with os.scandir(os.path.dirname(dump_file) or '.') as entries:
+            for entry in entries:
+                name = entry.name.lower()
+                if (name.endswith('.dic') or ('key' in name and name.endswith('.bin'))) and \
+                        entry.stat().st_mtime > json_mtime:
+                    return True
+    except FileNotFoundError:
+        return True
+    
+    return False
+
+def find_dumps_needing_decryption(directory: str, force_regenerate: bool = False,
+                                  include_stale: bool = False) -> List[str]:
     """Find dump files that need decryption."""
     missing_files = []
     
-    # Find all dump .bin files (exclude key files)
-    pattern = os.path.join(directory, "**/*.bin")
-    bin_files = glob.glob(pattern, recursive=True)
-    dump_files = [f for f in bin_files if 'key' not in f.lower()]
-    
-    for dump_file in dump_files:
+    for dump_file in iter_dump_files(directory):
         decrypted_json_file = dump_file.replace('.bin', '-decrypted.json')
         
         if force_regenerate or not os.path.exists(decrypted_json_file):
             missing_files.append(dump_file)
+        elif include_stale and is_decrypted_json_stale(decrypted_json_file, dump_file):
+            # Dump or key files changed since the JSON was written
+            missing_files.append(dump_file)
     
     return missing_files
 
@@ -373,14 +404,20 @@ def main():
                        help='Directory to process (default: current directory)')
     parser.add_argument('--force', action='store_true',
                        help='Force regenerate all decrypted files, not just missing ones')
+    parser.add_argument('--stale', action='store_true',
+                       help='Also regenerate decrypted files older than their dump or key files')
     parser.add_argument('--specific-file', 
                        help='Decrypt a specific dump file only')
     parser.add_argument('--key-source',
                        help='Specific key file to use (.bin or .dic format)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be processed without actually decrypting')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                       help='Number of worker processes (default: CPU count)')
     
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
     if not os.path.exists(args.directory):
         print(f"Error: Directory '{args.directory}' does not exist")
@@ -393,8 +430,6 @@ def main():
         print(f"Key source: {args.key_source}")
     print()
     
-    decryptor = RFIDDecryptor()
-    
     if args.specific_file:
         # Process specific file
         if not os.path.exists(args.specific_file):
@@ -405,6 +440,8 @@ def main():
             decrypted_json_file = args.specific_file.replace('.bin', '-decrypted.json')
             print(f"Would process: {args.specific_file} -> {decrypted_json_file}")
         else:
+            # Only needed here: pool workers each load parse.py in their own decryptor
+            decryptor = RFIDDecryptor()
             success = decryptor.process_dump_file(args.specific_file, args.key_source)
             if success:
                 print("✅ Decryption completed successfully")
@@ -413,7 +450,7 @@ def main():
                 sys.exit(1)
     else:
         # Process missing files
-        missing_files = find_dumps_needing_decryption(args.directory, args.force)
+        missing_files = find_dumps_needing_decryption(args.directory, args.force, args.stale)
         
         print(f"Found {len(missing_files)} dump files needing decryption")
         
@@ -440,11 +477,15 @@ def main():
         decrypted_count = 0
         failed_count = 0
         
-        for dump_file in missing_files:
-            if decryptor.process_dump_file(dump_file, args.key_source):
-                decrypted_count += 1
-            else:
-                failed_count += 1
+        # Dumps are independent, so spread them across all CPUs
+        worker = partial(process_dump_worker, key_source=args.key_source)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            for success, output in executor.map(worker, missing_files):
+                print(output, end='')
+                if success:
+                    decrypted_count += 1
+                else:
+                    failed_count += 1
         
         print(f"\\n📊 Decryption Summary:")
         print(f"✅ Successfully decrypted: {decrypted_count}")
@@ -9,15 +9,68 @@ used by Proxmark3 and other RFID tools, rather than human-readable decrypted con
 
 import os
 import json
-import glob
+import io
 import sys
+import tempfile
+import contextlib
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def dump_json_bytes(data: Dict[str, Any]) -> bytes:
+    """Serialize to JSON indented by 2 spaces, using orjson if installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+# mkstemp makes owner-only files, so written files are given the umask's permissions
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def write_file_atomically(path: str, payload: bytes) -> None:
+    """Write payload to path via a temporary file and a rename, so readers never see a partial file."""
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                     dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(temp_path, 0o666 & ~UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+# Sector trailer block numbers for MIFARE Classic 4K; 1K tags use the first 16.
+# Small sectors (0-31) have 4 blocks with the trailer at block 3, 7, 11, etc.
+# Large sectors (32-39) have 16 blocks with the trailer at 128+((sector-32)*16)+15
+SECTOR_TRAILER_BLOCKS = tuple(sector * 4 + 3 for sector in range(32)) + \
+                        tuple(128 + (sector - 32) * 16 + 15 for sector in range(32, 40))
+
+# Sector trailer block numbers as keys into the blocks dict
+SECTOR_TRAILER_KEYS = tuple(str(block) for block in SECTOR_TRAILER_BLOCKS)
+
+# AccessConditionsText keys for every block of a 4K tag
+BLOCK_NAMES = tuple(f"block{block}" for block in range(256))
+
+# Per-block access text for each sector size; the last block is the trailer
+TRAILER_ACCESS_TEXT = "read ACCESS by AB; write ACCESS by B"
+SMALL_SECTOR_ACCESS_TEXT = ("read AB",) * 3 + (TRAILER_ACCESS_TEXT,)
+LARGE_SECTOR_ACCESS_TEXT = ("read AB",) * 15 + (TRAILER_ACCESS_TEXT,)
 
 def extract_sector_keys_from_blocks(blocks: Dict[str, str]) -> Dict[str, Any]:
     """Extract SectorKeys from sector trailer blocks."""
-    sector_keys = {}
-    
     # Determine number of sectors based on available blocks
     max_block = max(int(k) for k in blocks.keys())
     if max_block >= 127:
@@ -29,71 +82,65 @@ def extract_sector_keys_from_blocks(blocks: Dict[str, str]) -> Dict[str, Any]:
     else:
         max_sectors = 16
     
-    for sector in range(max_sectors):
-        if sector < 32:
-            # Small sectors (0-31): 4 blocks each, trailer at block 3, 7, 11, etc.
-            sector_trailer_block = sector * 4 + 3
-        else:
-            # Large sectors (32-39): 16 blocks each, trailer at block 128+((sector-32)*16)+15
-            sector_trailer_block = 128 + (sector - 32) * 16 + 15
-        
-        if str(sector_trailer_block) not in blocks:
-            continue
-            
-        trailer_hex = blocks[str(sector_trailer_block)]
-        if len(trailer_hex) != 32:  # 16 bytes = 32 hex chars
-            continue
-            
-        # Extract keys and access conditions from sector trailer
-        # Structure: KeyA (6 bytes) + Access (4 bytes) + KeyB (6 bytes) 
-        key_a = trailer_hex[0:12]   # First 6 bytes (12 hex chars)
-        access_conditions = trailer_hex[12:20]  # Next 4 bytes (8 hex chars) 
-        key_b = trailer_hex[20:32]  # Last 6 bytes (12 hex chars)
-        
-        # Generate access conditions text (simplified version)
-        access_text = generate_access_conditions_text(access_conditions, sector)
-        
-        from collections import OrderedDict
-        sector_data = OrderedDict()
-        sector_data["KeyA"] = key_a
-        sector_data["KeyB"] = key_b
-        sector_data["AccessConditions"] = access_conditions
-        sector_data["AccessConditionsText"] = access_text
-        sector_keys[str(sector)] = sector_data
+    # Skip trailers that are missing or not 16 bytes (32 hex chars)
+    trailers = ((sector, blocks.get(block)) for sector, block in enumerate(SECTOR_TRAILER_KEYS[:max_sectors]))
+    return {str(sector): sector_key_entry(trailer_hex, sector)
+            for sector, trailer_hex in trailers
+            if trailer_hex is not None and len(trailer_hex) == 32}
+
+def sector_key_entry(trailer_hex: str, sector: int) -> Dict[str, Any]:
+    """Build the SectorKeys entry for one sector trailer."""
+    # Extract keys and access conditions from sector trailer
+    # Structure: KeyA (6 bytes) + Access (4 bytes) + KeyB (6 bytes) 
+    key_a = trailer_hex[0:12]   # First 6 bytes (12 hex chars)
+    access_conditions = trailer_hex[12:20]  # Next 4 bytes (8 hex chars) 
+    key_b = trailer_hex[20:32]  # Last 6 bytes (12 hex chars)
+    
+    # Generate access conditions text (simplified version)
+    access_text = generate_access_conditions_text(access_conditions, sector)
     
-    return sector_keys
+    return {
+        "KeyA": key_a,
+        "KeyB": key_b,
+        "AccessConditions": access_conditions,
+        "AccessConditionsText": access_text
+    }
 
+@functools.lru_cache(maxsize=None)
 def generate_access_conditions_text(access_conditions: str, sector: int) -> Dict[str, str]:
-    """Generate human-readable access conditions text."""
+    """Generate human-readable access conditions text.
+    
+    Most tags share the same trailer bytes, so results are cached and the same
+    dict is returned for repeated calls. Callers must not modify it.
+    """
     # This is a simplified implementation
     # Real access conditions parsing is complex, but most Bambu tags use standard conditions
     
     user_data = access_conditions[-2:]  # Last byte as user data
     
-    # Use ordered dict to maintain consistent field ordering - UserData first
-    from collections import OrderedDict
-    result = OrderedDict()
-    result["UserData"] = user_data
+    # Dicts keep insertion order, so UserData stays the first field
+    result = {"UserData": user_data}
     
     if sector < 32:
         # Small sectors (0-31): 4 blocks each
         base_block = sector * 4
-        for i in range(4):
-            if i == 3:
-                result[f"block{base_block + i}"] = "read ACCESS by AB; write ACCESS by B"
-            else:
-                result[f"block{base_block + i}"] = "read AB"
+        template = SMALL_SECTOR_ACCESS_TEXT
     else:
         # Large sectors (32-39): 16 blocks each
         base_block = 128 + (sector - 32) * 16
-        for i in range(16):
-            if i == 15:
-                result[f"block{base_block + i}"] = "read ACCESS by AB; write ACCESS by B"
-            else:
-                result[f"block{base_block + i}"] = "read AB"
+        template = LARGE_SECTOR_ACCESS_TEXT
+    
+    result.update(zip(BLOCK_NAMES[base_block:base_block + len(template)], template))
     
     return result
 
+# Supported dump sizes: (number of 16 byte blocks, card type)
+CARD_TYPES = {
+    1024: (64, "MIFARE Classic 1K"),              # 64 blocks of 16 bytes
+    1152: (72, "MIFARE Classic 1K+2sectors"),     # 1K + 2 sectors from 4K: 72 blocks
+    4096: (256, "MIFARE Classic 4K"),             # 256 blocks of 16 bytes
+}
+
 def bin_to_proxmark3_json(bin_file: str) -> Dict[str, Any]:
     """Convert a binary RFID dump to Proxmark3 JSON format."""
     try:
@@ -101,89 +148,110 @@ def bin_to_proxmark3_json(bin_file: str) -> Dict[str, Any]:
             data = f.read()
         
         # Determine card type based on file size
-        if len(data) == 1024:
-            # MIFARE Classic 1K: 64 blocks of 16 bytes
-            expected_blocks = 64
-            card_type = "MIFARE Classic 1K"
-        elif len(data) == 1152:
-            # MIFARE Classic 1K + 2 sectors from 4K: 72 blocks of 16 bytes  
-            expected_blocks = 72
-            card_type = "MIFARE Classic 1K+2sectors"
-        elif len(data) == 4096:
-            # MIFARE Classic 4K: 256 blocks of 16 bytes
-            expected_blocks = 256
-            card_type = "MIFARE Classic 4K"
-        else:
+        if len(data) not in CARD_TYPES:
             print(f"Warning: {bin_file} has {len(data)} bytes, unsupported size")
             return None
         
-        # Extract UID from first block (first 4 bytes)
-        uid = data[0:4].hex().upper()
-        
-        # Create blocks dictionary
-        blocks = {}
-        for block_num in range(expected_blocks):
-            start_pos = block_num * 16
-            end_pos = start_pos + 16
-            block_data = data[start_pos:end_pos]
-            blocks[str(block_num)] = block_data.hex().upper()
-        
-        # Extract SectorKeys from the blocks
-        sector_keys = extract_sector_keys_from_blocks(blocks)
-        
-        # MIFARE Classic values based on detected type
-        if card_type.startswith("MIFARE Classic 4K"):
-            atqa = "0200"  # MIFARE Classic 4K ATQA
-            sak = "18"     # MIFARE Classic 4K SAK
-        else:
-            atqa = "0400"  # MIFARE Classic 1K ATQA  
-            sak = "08"     # MIFARE Classic 1K SAK
-        
-        proxmark3_json = {
-            "Created": "proxmark3",
-            "FileType": "mfc v2",
-            "Card": {
-                "UID": uid,
-                "ATQA": atqa,
-                "SAK": sak
-            },
-            "blocks": blocks,
-            "SectorKeys": sector_keys
-        }
-        
-        return proxmark3_json
+        return dump_to_proxmark3_json(data)
         
     except Exception as e:
         print(f"Error processing {bin_file}: {e}")
         return None
 
-def find_all_bin_files(directory: str) -> list:
-    """Find all .bin files recursively, excluding key files."""
-    pattern = os.path.join(directory, "**/*.bin")
-    bin_files = glob.glob(pattern, recursive=True)
-    # Exclude key files and other non-dump files
-    bin_files = [f for f in bin_files if 'key' not in f.lower() and 'nonce' not in f.lower()]
-    return sorted(bin_files)
+@functools.lru_cache(maxsize=256)
+def dump_to_proxmark3_json(data: bytes) -> Dict[str, Any]:
+    """Build the Proxmark3 JSON structure for the contents of a dump.
+    
+    The result depends only on the dump bytes, so byte-identical dumps are
+    converted once and share the same dict. Callers must not modify it.
+    """
+    expected_blocks, card_type = CARD_TYPES[len(data)]
+    
+    # Hex-encode the whole dump once; the UID and blocks are slices of it
+    all_hex = data.hex().upper()
+    
+    # Extract UID from first block (first 4 bytes)
+    uid = all_hex[0:8]
+    
+    # Create blocks dictionary: 32 hex characters (16 bytes) per block
+    blocks = {str(block_num): all_hex[block_num * 32:(block_num + 1) * 32]
+              for block_num in range(expected_blocks)}
+    
+    # Extract SectorKeys from the blocks
+    sector_keys = extract_sector_keys_from_blocks(blocks)
+    
+    # MIFARE Classic values based on detected type
+    if card_type.startswith("MIFARE Classic 4K"):
+        atqa = "0200"  # MIFARE Classic 4K ATQA
+        sak = "18"     # MIFARE Classic 4K SAK
+    else:
+        atqa = "0400"  # MIFARE Classic 1K ATQA  
+        sak = "08"     # MIFARE Classic 1K SAK
+    
+    proxmark3_json = {
+        "Created": "proxmark3",
+        "FileType": "mfc v2",
+        "Card": {
+            "UID": uid,
+            "ATQA": atqa,
+            "SAK": sak
+        },
+        "blocks": blocks,
+        "SectorKeys": sector_keys
+    }
+    
+    return proxmark3_json
+
+def find_all_bin_files(directory: str) -> Iterator[str]:
+    """Yield all .bin files recursively, excluding key files, in name order per directory."""
+    with os.scandir(directory) as entries:
+        sorted_entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in sorted_entries:
+        if entry.name.startswith('.'):
+            continue  # Skip hidden entries
+        if entry.is_dir(follow_symlinks=False):
+            yield from find_all_bin_files(entry.path)
+        elif entry.name.endswith('.bin'):
+            # Exclude key files and other non-dump files
+            name = entry.name.lower()
+            if 'key' not in name and 'nonce' not in name:
+                yield entry.path
 
-def generate_encrypted_json_file(bin_file: str, force: bool = False) -> bool:
-    """Generate encrypted JSON file from binary dump."""
-    # Handle files that already have -dump in the name
+def is_proxmark3_json(json_file: str) -> bool:
+    """Check if an existing JSON file is already in Proxmark3 format."""
+    try:
+        # Files written by this script start with "Created" and reach "blocks"
+        # within the first few lines, so a short read is usually enough
+        with open(json_file, 'rb') as f:
+            head = f.read(256)
+        if b'"Created": "proxmark3"' in head and b'"blocks"' in head:
+            return True
+        
+        # Fall back to a full parse for files laid out differently (e.g. hand-edited)
+        with open(json_file, 'r') as f:
+            existing_data = json.load(f)
+        return existing_data.get("Created") == "proxmark3" and "blocks" in existing_data
+    except (json.JSONDecodeError, FileNotFoundError):
+        return False
+
+def json_path_for_bin(bin_file: str) -> str:
+    """Return the Proxmark3 JSON path for a .bin dump (name.bin or name-dump.bin -> name-dump.json)."""
     if bin_file.endswith('-dump.bin'):
-        json_file = bin_file.replace('-dump.bin', '-dump.json')
-    else:
-        json_file = bin_file.replace('.bin', '-dump.json')
+        return bin_file[:-len('-dump.bin')] + '-dump.json'
+    return bin_file[:-len('.bin')] + '-dump.json'
+
+def generate_encrypted_json_file(bin_file: str, force: bool = False, skip_existing_check: bool = False) -> bool:
+    """Generate encrypted JSON file from binary dump.
+    
+    Pass skip_existing_check=True when the caller has already checked the
+    existing JSON file, so it isn't read a second time.
+    """
+    json_file = json_path_for_bin(bin_file)
     
     # Check if file already exists and not forcing regeneration
-    if os.path.exists(json_file) and not force:
-        # Check if existing file is already in Proxmark3 format
-        try:
-            with open(json_file, 'r') as f:
-                existing_data = json.load(f)
-                if existing_data.get("Created") == "proxmark3" and "blocks" in existing_data:
-                    print(f"✅ Already encrypted format: {json_file}")
-                    return True
-        except (json.JSONDecodeError, FileNotFoundError):
-            pass
+    if not skip_existing_check and not force and os.path.exists(json_file) and is_proxmark3_json(json_file):
+        print(f"✅ Already encrypted format: {json_file}")
+        return True
     
     print(f"Processing: {bin_file}")
     
@@ -195,8 +263,7 @@ def generate_encrypted_json_file(bin_file: str, force: bool = False) -> bool:
     
     # Write JSON file
     try:
-        with open(json_file, 'w') as f:
-            json.dump(proxmark3_data, f, indent=2)
+        write_file_atomically(json_file, dump_json_bytes(proxmark3_data))
         
         print(f"✅ Generated: {json_file}")
         return True
@@ -205,6 +272,33 @@ def generate_encrypted_json_file(bin_file: str, force: bool = False) -> bool:
         print(f"❌ Failed to write {json_file}: {e}")
         return False
 
+def generate_encrypted_json_worker(bin_file: str, force: bool = False,
+                                   skip_existing_check: bool = False) -> Tuple[bool, str]:
+    """Generate one JSON file in a worker process, returning the result and its output."""
+    # Collect the output so files finishing in parallel don't mix their lines
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        success = generate_encrypted_json_file(bin_file, force, skip_existing_check)
+    return success, output.getvalue()
+
+def run_chunk(worker: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    """Run the worker on each item of a chunk, in a worker process."""
+    return [worker(item) for item in chunk]
+
+def map_bounded(executor: Executor, worker: Callable[[Any], Any], items: Iterable[Any],
+                chunksize: int = 1, max_pending: int = 2) -> Iterator[Any]:
+    """Like executor.map, but only keeps max_pending chunks submitted ahead of the results."""
+    items = iter(items)
+    pending = deque()
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if chunk:
+            pending.append(executor.submit(run_chunk, worker, chunk))
+        if not pending:
+            return
+        if not chunk or len(pending) >= max_pending:
+            yield from pending.popleft().result()
+
 def main():
     """Main function."""
     import argparse
@@ -218,8 +312,12 @@ def main():
                        help='Generate JSON for a specific .bin file only')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be processed without actually generating files')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                       help='Number of worker processes (default: CPU count)')
     
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
     if not os.path.exists(args.directory):
         print(f"Error: Directory '{args.directory}' does not exist")
@@ -247,59 +345,58 @@ def main():
                 sys.exit(1)
     else:
         # Process all bin files
-        bin_files = find_all_bin_files(args.directory)
-        
-        print(f"Found {len(bin_files)} binary files to process")
-        
-        if not bin_files:
-            print("✅ No binary files found!")
-            return
-        
         if args.dry_run:
-            print("\nFiles that would be processed:")
-            for bin_file in bin_files:
-                # Handle files that already have -dump in the name
-                if bin_file.endswith('-dump.bin'):
-                    json_file = bin_file.replace('-dump.bin', '-dump.json')
-                else:
-                    json_file = bin_file.replace('.bin', '-dump.json')
-                print(f"  {bin_file} -> {json_file}")
+            print("Files that would be processed:")
+            found_count = 0
+            for bin_file in find_all_bin_files(args.directory):
+                found_count += 1
+                print(f"  {bin_file} -> {json_path_for_bin(bin_file)}")
+            print(f"\nFound {found_count} binary files to process")
             return
         
         # Generate encrypted JSON files
-        print("\nGenerating encrypted JSON files...")
+        print("Generating encrypted JSON files...")
         generated_count = 0
         failed_count = 0
+        found_count = 0
         skipped_count = 0
         
-        for bin_file in bin_files:
-            # Handle files that already have -dump in the name
-            if bin_file.endswith('-dump.bin'):
-                json_file = bin_file.replace('-dump.bin', '-dump.json')
-            else:
-                json_file = bin_file.replace('.bin', '-dump.json')
-            
-            # Check if already in correct format
-            if os.path.exists(json_file) and not args.force:
-                try:
-                    with open(json_file, 'r') as f:
-                        existing_data = json.load(f)
-                        if existing_data.get("Created") == "proxmark3" and "blocks" in existing_data:
-                            skipped_count += 1
-                            continue
-                except (json.JSONDecodeError, FileNotFoundError):
-                    pass
-            
-            if generate_encrypted_json_file(bin_file, args.force):
-                generated_count += 1
-            else:
-                failed_count += 1
+        def pending_files() -> Iterator[str]:
+            """Yield the .bin files that need generating, counting the rest as skipped."""
+            nonlocal found_count, skipped_count
+            for bin_file in find_all_bin_files(args.directory):
+                found_count += 1
+                json_file = json_path_for_bin(bin_file)
+                
+                # Check if already generated
+                if not args.force and os.path.exists(json_file) and is_proxmark3_json(json_file):
+                    skipped_count += 1
+                    continue
+                
+                yield bin_file
+        
+        # Each file is converted independently, so use all CPUs. Files are
+        # handed out as the walk finds them, in chunks to cut down on IPC.
+        # Existing files were checked above, so workers don't re-read them.
+        worker = partial(generate_encrypted_json_worker, force=args.force, skip_existing_check=True)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            max_pending = 2 * (args.jobs or os.cpu_count() or 1)
+            for success, output in map_bounded(executor, worker, pending_files(), 16, max_pending):
+                print(output, end='')
+                if success:
+                    generated_count += 1
+                else:
+                    failed_count += 1
+        
+        if found_count == 0:
+            print("✅ No binary files found!")
+            return
         
         print(f"\n📊 Generation Summary:")
         print(f"✅ Successfully generated: {generated_count}")
         print(f"⏭️  Already encrypted (skipped): {skipped_count}")
         print(f"❌ Failed: {failed_count}")
-        print(f"📁 Total processed: {len(bin_files)}")
+        print(f"📁 Total processed: {found_count}")
         
         # Calculate success rate
         total_processed = generated_count + failed_count
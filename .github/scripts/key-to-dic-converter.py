@@ -9,9 +9,30 @@ Each key.bin contains 16 keys of 6 bytes each (12 hex characters per key).
 import os
 import sys
 import glob
+import tempfile
 from pathlib import Path
 from typing import List, Dict, Any
 
+# mkstemp makes owner-only files, so written files are given the umask's permissions
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def write_file_atomically(path: str, payload: bytes) -> None:
+    """Write payload to path via a temporary file and a rename, so readers never see a partial file."""
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                     dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(temp_path, 0o666 & ~UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
 def convert_key_bin_to_dic(key_bin_path: str) -> bool:
     """Convert a single key.bin file to .dic format."""
     try:
@@ -25,19 +46,12 @@ def convert_key_bin_to_dic(key_bin_path: str) -> bool:
         if len(key_data) < 96:  # At least 16 keys * 6 bytes
             print(f"Warning: {key_bin_path} is smaller than expected ({len(key_data)} bytes)")
         
-        # Extract keys (6 bytes each, skip zero padding)
-        keys = []
-        for i in range(0, len(key_data), 6):
-            key_bytes = key_data[i:i+6]
-            
-            # Skip if key is all zeros (padding)
-            if key_bytes == b'\x00\x00\x00\x00\x00\x00':
-                continue
-                
-            # Convert to hex string (uppercase, no separators)
-            hex_key = key_bytes.hex().upper()
-            if len(hex_key) == 12:  # Valid 6-byte key
-                keys.append(hex_key)
+        # Convert to hex once (uppercase, no separators), then split into
+        # 12 hex character (6 byte) keys, skipping zero padding and any
+        # incomplete trailing key
+        hex_data = key_data.hex().upper()
+        keys = [hex_data[i:i+12] for i in range(0, len(hex_data) - 11, 12)]
+        keys = [key for key in keys if key != '000000000000']
         
         if not keys:
             print(f"No valid keys found in {key_bin_path}")
@@ -47,9 +61,7 @@ def convert_key_bin_to_dic(key_bin_path: str) -> bool:
         dic_path = key_bin_path.replace('.bin', '.dic')
         
         # Write .dic file
-        with open(dic_path, 'w') as f:
-            for key in keys:
-                f.write(key + '\n')
+        write_file_atomically(dic_path, ('\n'.join(keys) + '\n').encode('ascii'))
         
         print(f"✅ Generated: {dic_path} ({len(keys)} keys)")
         return True
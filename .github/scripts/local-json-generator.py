@@ -10,15 +10,88 @@ import os
 import json
 import subprocess
 import sys
-import glob
+import tempfile
+import io
+import contextlib
+import itertools
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def dump_json_bytes(data: Dict[str, Any]) -> bytes:
+    """Serialize to JSON indented by 2 spaces, using orjson if installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def load_json_file(json_path: str) -> Any:
+    """Read and parse a JSON file, using orjson if installed."""
+    with open(json_path, 'rb') as f:
+        content = f.read()
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+# mkstemp makes owner-only files, so written files are given the umask's permissions
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+def write_file_atomically(path: str, payload: bytes) -> None:
+    """Write payload to path via a temporary file and a rename, so readers never see a partial file."""
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                     dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(temp_path, 0o666 & ~UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
 
 def yaml_to_json(yaml_output: str) -> Dict[str, Any]:
     """
     Convert YAML-like parse.py output to proper JSON.
     This matches the conversion logic used in the CI workflow.
     """
+    # Only for parse scripts without JSON output; parsed line by line rather than
+    # as YAML, which would read "#" in free text as a comment and quotes as syntax
+    return parse_yaml_lines(yaml_output)
+
+def fields_to_json(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the fields from `parse.py --output=json` to the same layout as yaml_to_json."""
+    data = {}
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            entries = value.items()  # temperatures, merged into the top level
+        elif isinstance(value, list):
+            continue  # Warnings
+        else:
+            entries = [(key, value)]
+        
+        for entry_key, entry_value in entries:
+            entry_value = str(entry_value).strip()
+            if entry_value:  # Fields printed without a value are left out
+                data[entry_key] = convert_field_value(entry_value)
+    return data
+
+def convert_field_value(value: str) -> Any:
+    """Type a parse.py field value: plain digits become ints; no tag field is ever a boolean."""
+    # isdigit() rather than int(), which would also take signs and '_' (e.g. "24_09_07_17")
+    return int(value) if value.isdigit() else value
+
+def parse_yaml_lines(yaml_output: str) -> Dict[str, Any]:
+    """Line-by-line fallback parser for parse.py output."""
     lines = yaml_output.strip().split('\n')
     data = {}
     i = 0
@@ -29,87 +102,160 @@ def yaml_to_json(yaml_output: str) -> Dict[str, Any]:
             i += 1
             continue
         
-        # Handle lines that start with "- " (YAML list items)
-        if line.startswith('- ') and ': ' in line:
+        # Handle lines that start with "- " (YAML list items) and regular key: value lines
+        if line.startswith('- '):
             line = line[2:]  # Remove "- " prefix
-            key_val, value = line.split(': ', 1)
-            key = key_val.strip()
-            value = value.strip()
-            
-            # Handle nested temperatures section
-            if key == 'temperatures' and not value:  # temperatures: (empty value)
-                data['temperatures'] = {}
-                i += 1
-                # Look for indented temperature fields with "  - " prefix
-                while i < len(lines) and lines[i].startswith('  - '):
-                    temp_line = lines[i][4:]  # Remove '  - '
-                    if ': ' in temp_line:
-                        temp_key, temp_val = temp_line.split(': ', 1)
-                        temp_key = temp_key.strip()
-                        temp_val = temp_val.strip()
-                        # Convert bed_temp_type to int
-                        if temp_key == 'bed_temp_type':
-                            try:
-                                temp_val = int(temp_val)
-                            except ValueError:
-                                pass  # Keep as string if conversion fails
-                        data['temperatures'][temp_key] = temp_val
-                    i += 1
-                continue
-            
-            # Handle other fields
-            if value.isdigit():
-                data[key] = int(value)
-            elif value.lower() == 'true':
-                data[key] = True
-            elif value.lower() == 'false':
-                data[key] = False
-            else:
-                data[key] = value
+        elif line.startswith('-'):
+            i += 1
+            continue
         
-        elif ': ' in line and not line.startswith('-'):
-            # Handle regular key: value lines
-            key_val, value = line.split(': ', 1)
-            key = key_val.strip()
-            value = value.strip()
-            
-            # Handle nested temperatures section
-            if key == 'temperatures' and not value:  # temperatures: (empty value)
-                data['temperatures'] = {}
-                i += 1
-                # Look for indented temperature fields with "  - " prefix
-                while i < len(lines) and lines[i].startswith('  - '):
-                    temp_line = lines[i][4:]  # Remove '  - '
-                    if ': ' in temp_line:
-                        temp_key, temp_val = temp_line.split(': ', 1)
-                        temp_key = temp_key.strip()
-                        temp_val = temp_val.strip()
-                        # Convert bed_temp_type to int
-                        if temp_key == 'bed_temp_type':
-                            try:
-                                temp_val = int(temp_val)
-                            except ValueError:
-                                pass  # Keep as string if conversion fails
-                        data['temperatures'][temp_key] = temp_val
-                    i += 1
-                continue
-            
-            # Handle other fields
-            if value.isdigit():
-                data[key] = int(value)
-            elif value.lower() == 'true':
-                data[key] = True
-            elif value.lower() == 'false':
-                data[key] = False
-            else:
-                data[key] = value
+        key_val, sep, value = line.partition(': ')
+        if not sep:
+            i += 1
+            continue
+        key = key_val.strip()
+        value = value.strip()
+        
+        # Handle nested temperatures section
+        if key == 'temperatures' and not value:  # temperatures: (empty value)
+            data['temperatures'], i = parse_temperature_lines(lines, i + 1)
+            continue
         
+        # Handle other fields
+        data[key] = convert_field_value(value)
         i += 1
     
     return data
 
-def generate_json_for_bin(bin_file: str, parse_script: str = 'parse.py') -> bool:
-    """Generate JSON for a single .bin file."""
+def parse_temperature_lines(lines: List[str], i: int) -> Tuple[Dict[str, Any], int]:
+    """Parse the indented "  - key: value" temperature fields starting at lines[i].
+    
+    Returns the temperatures and the index of the first line after them.
+    """
+    temperatures = {}
+    while i < len(lines) and lines[i].startswith('  - '):
+        temp_key, sep, temp_val = lines[i][4:].partition(': ')  # Remove '  - '
+        i += 1
+        if not sep:
+            continue
+        
+        temp_key = temp_key.strip()
+        temp_val = temp_val.strip()
+        # Convert bed_temp_type to int
+        if temp_key == 'bed_temp_type':
+            try:
+                temp_val = int(temp_val)
+            except ValueError:
+                pass  # Keep as string if conversion fails
+        temperatures[temp_key] = temp_val
+    return temperatures, i
+
+def json_path_for_bin(bin_file: str) -> str:
+    """Return the JSON path for a .bin dump."""
+    return bin_file[:-len('.bin')] + '.json'
+
+class ParseScriptProcess:
+    """A long-running `parse.py --batch` process that parses one dump per request."""
+    
+    def __init__(self, parse_script: str = 'parse.py', timeout: float = 30):
+        self.timeout = timeout
+        self.process = subprocess.Popen(
+            ['python3', os.path.abspath(parse_script), '--batch'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd=os.path.dirname(parse_script) or '.'
+        )
+        # Set once parse.py has answered, which shows it supports --batch
+        self.replied = False
+        # Replies are read on their own thread so a hung parse.py can be timed out
+        self.replies = queue.Queue()
+        threading.Thread(target=self.read_replies, daemon=True).start()
+    
+    def read_replies(self):
+        """Queue each line parse.py prints, then '' once it exits."""
+        for line in self.process.stdout:
+            self.replies.put(line)
+        self.replies.put('')
+    
+    def is_running(self) -> bool:
+        """Check if the parse.py process is still accepting requests."""
+        return self.process.poll() is None
+    
+    def stop(self):
+        """Stop parse.py and wait for it, so the next file starts a fresh process."""
+        self.process.kill()
+        self.process.wait()
+    
+    def parse(self, bin_file: str) -> Optional[Dict[str, Any]]:
+        """Parse a dump, returning its fields ({} if not a valid tag) or None if it can't be read or decoded."""
+        try:
+            # parse.py runs in its own directory, so send an absolute path
+            self.process.stdin.write(os.path.abspath(bin_file) + '\n')
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            self.stop()
+            raise RuntimeError("parse.py exited unexpectedly")
+        
+        try:
+            line = self.replies.get(timeout=self.timeout)
+        except queue.Empty:
+            self.stop()
+            raise subprocess.TimeoutExpired(self.process.args, self.timeout)
+        if not line:
+            self.stop()
+            raise RuntimeError("parse.py exited unexpectedly")
+        self.replied = True
+        return json.loads(line)
+
+# Each worker process keeps one parse.py running instead of starting one per file,
+# or False once parse.py turns out not to run with --batch
+worker_parse_process = None
+
+def batch_parse(bin_file: str, parse_script: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Parse a dump with this worker's long-running parse.py.
+    
+    Returns whether it was parsed and the fields as ParseScriptProcess.parse
+    gives them. It isn't parsed if parse.py can't be started with --batch or
+    exits on its first request (e.g. an older parse.py without it), and the
+    caller should run parse.py for the file on its own.
+    """
+    global worker_parse_process
+    if worker_parse_process is False:
+        return False, None
+    if worker_parse_process is None or not worker_parse_process.is_running():
+        try:
+            worker_parse_process = ParseScriptProcess(parse_script)
+        except OSError:
+            worker_parse_process = False
+            return False, None
+    
+    parse_process = worker_parse_process
+    try:
+        return True, parse_process.parse(bin_file)
+    except RuntimeError:
+        if parse_process.replied:
+            raise
+        worker_parse_process = False
+        return False, None
+
+def run_parse_script(parse_script: str, args: List[str]) -> subprocess.CompletedProcess:
+    """Run parse.py once with the given arguments, capturing its output."""
+    return subprocess.run(
+        ['python3', parse_script] + args,
+        capture_output=True,
+        text=True,
+        timeout=30,
+        cwd=os.path.dirname(parse_script) or '.'
+    )
+
+def generate_json_for_bin(bin_file: str, parse_script: str = 'parse.py', batch: bool = False) -> bool:
+    """Generate JSON for a single .bin file.
+    
+    With batch=True the worker's long-running parse.py is used when it can be,
+    instead of starting parse.py for this file alone.
+    """
     try:
         print(f"Processing: {bin_file}")
         
@@ -118,31 +264,42 @@ def generate_json_for_bin(bin_file: str, parse_script: str = 'parse.py') -> bool
             print(f"Error: {parse_script} not found")
             return False
         
-        # Run parse.py on the .bin file
-        result = subprocess.run(
-            ['python3', parse_script, bin_file],
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=os.path.dirname(parse_script) or '.'
-        )
-        
-        if result.returncode != 0:
-            print(f"Error parsing {bin_file}:")
-            print(f"  stdout: {result.stdout}")
-            print(f"  stderr: {result.stderr}")
-            return False
-        
-        # Convert YAML-like output to JSON
-        json_data = yaml_to_json(result.stdout)
+        parsed, fields = batch_parse(bin_file, parse_script) if batch else (False, None)
+        if parsed:
+            if fields is None:
+                print(f"Error parsing {bin_file}: file could not be read or decoded")
+                return False
+            json_data = fields_to_json(fields)
+        else:
+            # Run parse.py on the .bin file, asking for JSON so no YAML parsing is needed
+            result = run_parse_script(parse_script, ['--output=json', bin_file])
+            if result.returncode != 0:
+                # A parse script without JSON output (e.g. an older parse.py) takes
+                # --output=json for a file name and fails, so ask for text instead
+                result = run_parse_script(parse_script, [bin_file])
+            
+            if result.returncode != 0:
+                print(f"Error parsing {bin_file}:")
+                print(f"  stdout: {result.stdout}")
+                print(f"  stderr: {result.stderr}")
+                return False
+            
+            # parse.py prints nothing for a dump that isn't a valid tag
+            try:
+                fields = json.loads(result.stdout) if result.stdout.strip() else {}
+            except json.JSONDecodeError:
+                fields = None
+            if isinstance(fields, dict):
+                json_data = fields_to_json(fields)
+            else:
+                json_data = yaml_to_json(result.stdout)
         
         # Add filename for reference
         json_data['filename'] = bin_file
         
         # Write JSON file
-        json_file = bin_file.replace('.bin', '.json')
-        with open(json_file, 'w') as f:
-            json.dump(json_data, f, indent=2)
+        json_file = json_path_for_bin(bin_file)
+        write_file_atomically(json_file, dump_json_bytes(json_data))
         
         print(f"✅ Generated: {json_file}")
         return True
@@ -154,42 +311,88 @@ def generate_json_for_bin(bin_file: str, parse_script: str = 'parse.py') -> bool
         print(f"❌ Failed to process {bin_file}: {e}")
         return False
 
+def generate_json_worker(bin_file: str, parse_script: str = 'parse.py') -> Tuple[bool, str]:
+    """Generate JSON for one .bin file in a worker process, returning the result and its output."""
+    # Collect the output so files finishing in parallel don't mix their lines
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        success = generate_json_for_bin(bin_file, parse_script, batch=True)
+    return success, output.getvalue()
+
 def is_encrypted_json(json_path: str) -> bool:
     """Check if JSON file contains encrypted Proxmark3 format data."""
     try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-            # Encrypted JSON files have Proxmark3 structure with blocks
-            return (data.get("Created") == "proxmark3" or 
-                    "blocks" in data or 
-                    data.get("FileType") == "mfc v2")
+        # Proxmark3 dumps start with "Created" and files written by this script
+        # start with "uid", so the first bytes usually settle it
+        with open(json_path, 'rb') as f:
+            head = f.read(256)
+        if b'"Created": "proxmark3"' in head or b'"FileType": "mfc v2"' in head:
+            return True
+        if head.startswith(b'{\n  "uid": '):
+            return False
+        
+        # Fall back to a full parse for files laid out differently (e.g. hand-edited)
+        data = load_json_file(json_path)
+        # Encrypted JSON files have Proxmark3 structure with blocks
+        return (data.get("Created") == "proxmark3" or 
+                "blocks" in data or 
+                data.get("FileType") == "mfc v2")
     except (json.JSONDecodeError, FileNotFoundError):
         return False
 
-def find_missing_json_files(directory: str, force_regenerate: bool = False) -> List[str]:
-    """Find .bin files that don't have corresponding .json files.
+def find_missing_json_files(directory: str, force_regenerate: bool = False) -> Iterator[str]:
+    """Yield .bin files that don't have corresponding .json files.
     
     Note: Never overwrites existing encrypted JSON files, even with force_regenerate=True.
     Encrypted JSON files (Proxmark3 format) are preserved to maintain original dump data.
     """
-    missing_files = []
+    # Each directory listing also tells us which JSON files exist, so no extra stat calls
+    with os.scandir(directory) as entries:
+        dir_entries = list(entries)
+    names = {entry.name for entry in dir_entries}
+    subdirs = []
     
-    # Find all .bin files, excluding key files
-    pattern = os.path.join(directory, "**/*.bin")
-    bin_files = glob.glob(pattern, recursive=True)
-    bin_files = [f for f in bin_files if 'key' not in f.lower()]
-    
-    for bin_file in bin_files:
-        json_file = bin_file.replace('.bin', '.json')
+    for entry in dir_entries:
+        if entry.name.startswith('.'):
+            continue  # Skip hidden entries
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+            continue
+        
+        # Only .bin dumps, excluding key files
+        if not entry.name.endswith('.bin') or 'key' in entry.name.lower():
+            continue
+        
+        json_name = entry.name[:-len('.bin')] + '.json'
         
         # Only process if no JSON exists, OR if force_regenerate AND it's not encrypted format
-        if not os.path.exists(json_file):
-            missing_files.append(bin_file)
-        elif force_regenerate and not is_encrypted_json(json_file):
+        if json_name not in names:
+            yield entry.path
+        elif force_regenerate and not is_encrypted_json(os.path.join(directory, json_name)):
             # Only regenerate if it's not an encrypted Proxmark3 format file
-            missing_files.append(bin_file)
+            yield entry.path
     
-    return missing_files
+    # A directory's own files come before its subdirectories', in the same order as glob
+    for subdir in subdirs:
+        yield from find_missing_json_files(subdir, force_regenerate)
+
+def run_chunk(worker: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    """Run the worker on each item of a chunk, in a worker process."""
+    return [worker(item) for item in chunk]
+
+def map_bounded(executor: Executor, worker: Callable[[Any], Any], items: Iterable[Any],
+                chunksize: int = 1, max_pending: int = 2) -> Iterator[Any]:
+    """Like executor.map, but only keeps max_pending chunks submitted ahead of the results."""
+    items = iter(items)
+    pending = deque()
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if chunk:
+            pending.append(executor.submit(run_chunk, worker, chunk))
+        if not pending:
+            return
+        if not chunk or len(pending) >= max_pending:
+            yield from pending.popleft().result()
 
 def main():
     """Main function."""
@@ -206,8 +409,12 @@ def main():
                        help='Generate JSON for a specific .bin file only')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be processed without actually generating files')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                       help='Number of worker processes (default: CPU count)')
     
     args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
     if not os.path.exists(args.directory):
         print(f"Error: Directory '{args.directory}' does not exist")
@@ -245,12 +452,12 @@ def main():
                 print("❌ Generation failed")
                 sys.exit(1)
     else:
-        # Process missing files
+        # Process missing files, starting on them while the walk is still finding more
         missing_files = find_missing_json_files(args.directory, args.force)
+        first_file = next(missing_files, None)
         
-        print(f"Found {len(missing_files)} files needing JSON generation")
-        
-        if not missing_files:
+        if first_file is None:
+            print(f"Found 0 files needing JSON generation")
             print("✅ All .bin files have corresponding .json files!")
             print(f"\n📊 Generation Summary:")
             print(f"✅ Successfully generated: 0")
@@ -259,28 +466,37 @@ def main():
             print(f"\n🎉 All JSON files are up to date!")
             return
         
+        missing_files = itertools.chain([first_file], missing_files)
+        
         if args.dry_run:
+            missing_files = list(missing_files)
+            print(f"Found {len(missing_files)} files needing JSON generation")
             print("\nFiles that would be processed:")
             for bin_file in missing_files:
-                json_file = bin_file.replace('.bin', '.json')
+                json_file = json_path_for_bin(bin_file)
                 print(f"  {bin_file} -> {json_file}")
             return
         
         # Generate JSON files
-        print("\nGenerating JSON files...")
+        print("Generating JSON files...")
         generated_count = 0
         failed_count = 0
         
-        for bin_file in missing_files:
-            if generate_json_for_bin(bin_file, parse_script):
-                generated_count += 1
-            else:
-                failed_count += 1
+        # Each worker parses its files with its own long-running parse.py, so keep all CPUs busy
+        worker = partial(generate_json_worker, parse_script=parse_script)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            max_pending = 2 * (args.jobs or os.cpu_count() or 1)
+            for success, output in map_bounded(executor, worker, missing_files, 1, max_pending):
+                print(output, end='')
+                if success:
+                    generated_count += 1
+                else:
+                    failed_count += 1
         
         print(f"\n📊 Generation Summary:")
         print(f"✅ Successfully generated: {generated_count}")
         print(f"❌ Failed: {failed_count}")
-        print(f"📁 Total processed: {len(missing_files)}")
+        print(f"📁 Total processed: {generated_count + failed_count}")
         
         # Always output success rate for workflow parsing
         total_files = generated_count + failed_count
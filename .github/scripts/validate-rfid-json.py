@@ -9,99 +9,161 @@ Validates generated JSON files for:
 - Data consistency
 """
 
+import os
 import json
-import glob
 import sys
+import itertools
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-class RFIDJsonValidator:
-    def __init__(self):
-        # Core required fields from parse.py output
-        self.required_fields = {
-            'uid', 'filament_type', 'filament_color', 
-            'spool_weight', 'filament_diameter', 'filename'
-        }
-        # Expected temperature fields (not all may be present)
-        self.temperature_fields = {
-            'min_hotend', 'max_hotend', 'bed_temp', 
-            'bed_temp_type', 'drying_time', 'drying_temp'
-        }
-        # Common optional fields that shouldn't be missing in most cases
-        self.common_fields = {
-            'material_id', 'variant_id', 'detailed_filament_type',
-            'spool_width', 'filament_length', 'tray_uid'
-        }
+def load_json_file(json_path: str) -> Any:
+    """Read and parse a JSON file, using orjson if installed."""
+    with open(json_path, 'rb') as f:
+        content = f.read()
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+# Core required fields from parse.py output
+REQUIRED_FIELDS = frozenset({
+    'uid', 'filament_type', 'filament_color', 
+    'spool_weight', 'filament_diameter', 'filename'
+})
+# Expected temperature fields (not all may be present)
+TEMPERATURE_FIELDS = frozenset({
+    'min_hotend', 'max_hotend', 'bed_temp', 
+    'bed_temp_type', 'drying_time', 'drying_temp'
+})
+# Common optional fields that shouldn't be missing in most cases
+COMMON_FIELDS = frozenset({
+    'material_id', 'variant_id', 'detailed_filament_type',
+    'spool_width', 'filament_length', 'tray_uid'
+})
+
+def validate_json_file(json_path: str, bin_exists: Optional[bool] = None) -> Dict[str, Any]:
+    """Validate a single JSON file.
+    
+    bin_exists says whether the matching .bin file exists, if the caller
+    already knows; otherwise it is checked on disk.
+    """
+    errors = []
+    warnings = []
+    result = {
+        'file': json_path,
+        'valid': False,
+        'errors': errors,
+        'warnings': warnings
+    }
+    
+    try:
+        data = load_json_file(json_path)
+            
+        # Check required fields
+        # difference() takes the dict's keys directly, without building a set
+        missing_fields = REQUIRED_FIELDS.difference(data)
+        if missing_fields:
+            errors.append(f"Missing required fields: {set(missing_fields)}")
         
-    def validate_json_file(self, json_path: str) -> Dict[str, Any]:
-        """Validate a single JSON file."""
-        result = {
-            'file': json_path,
-            'valid': False,
-            'errors': [],
-            'warnings': []
-        }
+        # Validate temperature section
+        if 'temperatures' in data:
+            if isinstance(data['temperatures'], dict):
+                missing_temp_fields = TEMPERATURE_FIELDS.difference(data['temperatures'])
+                if missing_temp_fields:
+                    warnings.append(f"Missing temperature fields: {set(missing_temp_fields)}")
+            else:
+                errors.append("Temperature section should be a dictionary")
+        else:
+            warnings.append("No temperature section found")
         
-        try:
-            with open(json_path, 'r') as f:
-                data = json.load(f)
-                
-            # Check required fields
-            missing_fields = self.required_fields - set(data.keys())
-            if missing_fields:
-                result['errors'].append(f"Missing required fields: {missing_fields}")
-            
-            # Validate temperature section
-            if 'temperatures' in data:
-                if isinstance(data['temperatures'], dict):
-                    missing_temp_fields = self.temperature_fields - set(data['temperatures'].keys())
-                    if missing_temp_fields:
-                        result['warnings'].append(f"Missing temperature fields: {missing_temp_fields}")
-                else:
-                    result['errors'].append("Temperature section should be a dictionary")
+        # Validate UID format
+        if 'uid' in data:
+            uid = data['uid']
+            if not isinstance(uid, str) or len(uid) != 8:
+                errors.append(f"UID should be 8-character string, got: {uid}")
             else:
-                result['warnings'].append("No temperature section found")
-            
-            # Validate UID format
-            if 'uid' in data:
-                uid = data['uid']
-                if not isinstance(uid, str) or len(uid) != 8:
-                    result['errors'].append(f"UID should be 8-character string, got: {uid}")
-                else:
-                    try:
-                        int(uid, 16)  # Check if valid hex
-                    except ValueError:
-                        result['errors'].append(f"UID should be valid hex string: {uid}")
-            
-            # Check if corresponding .bin file exists
-            bin_path = json_path.replace('.json', '.bin')
-            if not Path(bin_path).exists():
-                result['warnings'].append(f"Corresponding .bin file not found: {bin_path}")
-            
-            # Set valid if no errors
-            result['valid'] = len(result['errors']) == 0
-            
-        except json.JSONDecodeError as e:
-            result['errors'].append(f"Invalid JSON format: {e}")
-        except Exception as e:
-            result['errors'].append(f"Error reading file: {e}")
-            
-        return result
-    
-    def validate_directory(self, directory: str) -> Dict[str, Any]:
-        """Validate all JSON files in a directory."""
-        json_files = glob.glob(f"{directory}/**/*.json", recursive=True)
+                try:
+                    int(uid, 16)  # Check if valid hex
+                except ValueError:
+                    errors.append(f"UID should be valid hex string: {uid}")
         
-        # Filter out key files
-        rfid_json_files = [f for f in json_files if 'key' not in f.lower()]
+        # Check if corresponding .bin file exists
+        bin_path = json_path[:-len('.json')] + '.bin'
+        if bin_exists is None:
+            bin_exists = Path(bin_path).exists()
+        if not bin_exists:
+            warnings.append(f"Corresponding .bin file not found: {bin_path}")
         
-        results = []
-        valid_count = 0
-        total_errors = 0
-        total_warnings = 0
+        # Set valid if no errors
+        result['valid'] = len(errors) == 0
         
-        for json_file in rfid_json_files:
-            result = self.validate_json_file(json_file)
+    except json.JSONDecodeError as e:
+        errors.append(f"Invalid JSON format: {e}")
+    except Exception as e:
+        errors.append(f"Error reading file: {e}")
+        
+    return result
+
+def validate_json_entry(entry: Tuple[str, bool]) -> Dict[str, Any]:
+    """Validate a (json_path, bin_exists) pair from find_json_files."""
+    return validate_json_file(*entry)
+
+def find_json_files(directory: str) -> Iterator[Tuple[str, bool]]:
+    """Yield (path, bin_exists) for all JSON files recursively, excluding key files, in the same order as glob.
+    
+    bin_exists comes from the same directory listing, so no extra stat is needed.
+    """
+    with os.scandir(directory) as entries:
+        dir_entries = list(entries)
+    names = {entry.name for entry in dir_entries}
+    subdirs = []
+    
+    for entry in dir_entries:
+        if entry.name.startswith('.'):
+            continue  # Skip hidden entries
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.name.endswith('.json') and 'key' not in entry.name.lower():
+            yield entry.path, entry.name[:-len('.json')] + '.bin' in names
+    
+    # A directory's own files come before its subdirectories'
+    for subdir in subdirs:
+        yield from find_json_files(subdir)
+
+def run_chunk(worker: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    """Run the worker on each item of a chunk, in a worker process."""
+    return [worker(item) for item in chunk]
+
+def map_bounded(executor: Executor, worker: Callable[[Any], Any], items: Iterable[Any],
+                chunksize: int = 1, max_pending: int = 2) -> Iterator[Any]:
+    """Like executor.map, but only keeps max_pending chunks submitted ahead of the results."""
+    items = iter(items)
+    pending = deque()
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if chunk:
+            pending.append(executor.submit(run_chunk, worker, chunk))
+        if not pending:
+            return
+        if not chunk or len(pending) >= max_pending:
+            yield from pending.popleft().result()
+
+def validate_directory(directory: str, jobs: Optional[int] = None) -> Dict[str, Any]:
+    """Validate all JSON files in a directory, using up to jobs worker processes (default: CPU count)."""
+    results = []
+    valid_count = 0
+    total_errors = 0
+    total_warnings = 0
+    
+    # Files are validated independently, starting while the walk is still
+    # finding more; results come back in file order
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        max_pending = 2 * (jobs or os.cpu_count() or 1)
+        for result in map_bounded(executor, validate_json_entry, find_json_files(directory), 32, max_pending):
             results.append(result)
             
             if result['valid']:
@@ -109,68 +171,78 @@ class RFIDJsonValidator:
             
             total_errors += len(result['errors'])
             total_warnings += len(result['warnings'])
+    
+    summary = {
+        'total_files': len(results),
+        'valid_files': valid_count,
+        'invalid_files': len(results) - valid_count,
+        'total_errors': total_errors,
+        'total_warnings': total_warnings,
+        'results': results
+    }
+    
+    return summary
+
+def print_validation_report(summary: Dict[str, Any]) -> None:
+    """Print a formatted validation report."""
+    # Build the whole report and write it once rather than printing line by line
+    lines = [
+        f"\n🔍 RFID JSON Validation Report",
+        f"{'=' * 50}",
+        f"📊 Total Files: {summary['total_files']}",
+        f"✅ Valid Files: {summary['valid_files']}",
+        f"❌ Invalid Files: {summary['invalid_files']}",
+        f"🚨 Total Errors: {summary['total_errors']}",
+        f"⚠️  Total Warnings: {summary['total_warnings']}"
+    ]
+    
+    if summary['invalid_files'] > 0:
+        lines.append(f"\n❌ Files with Errors:")
+        for result in summary['results']:
+            if not result['valid']:
+                lines.append(f"  📄 {result['file']}")
+                lines.extend(f"    ❌ {error}" for error in result['errors'])
+    
+    if summary['total_warnings'] > 0:
+        lines.append(f"\n⚠️  Files with Warnings:")
+        warning_files = [r for r in summary['results'] if r['warnings']]
+        for result in warning_files[:5]:  # Show first 5
+            lines.append(f"  📄 {result['file']}")
+            lines.extend(f"    ⚠️  {warning}" for warning in result['warnings'])
         
-        summary = {
-            'total_files': len(rfid_json_files),
-            'valid_files': valid_count,
-            'invalid_files': len(rfid_json_files) - valid_count,
-            'total_errors': total_errors,
-            'total_warnings': total_warnings,
-            'results': results
-        }
-        
-        return summary
-    
-    def print_validation_report(self, summary: Dict[str, Any]) -> None:
-        """Print a formatted validation report."""
-        print(f"\n🔍 RFID JSON Validation Report")
-        print(f"{'=' * 50}")
-        print(f"📊 Total Files: {summary['total_files']}")
-        print(f"✅ Valid Files: {summary['valid_files']}")
-        print(f"❌ Invalid Files: {summary['invalid_files']}")
-        print(f"🚨 Total Errors: {summary['total_errors']}")
-        print(f"⚠️  Total Warnings: {summary['total_warnings']}")
-        
-        if summary['invalid_files'] > 0:
-            print(f"\n❌ Files with Errors:")
-            for result in summary['results']:
-                if not result['valid']:
-                    print(f"  📄 {result['file']}")
-                    for error in result['errors']:
-                        print(f"    ❌ {error}")
-        
-        if summary['total_warnings'] > 0:
-            print(f"\n⚠️  Files with Warnings:")
-            warning_files = [r for r in summary['results'] if r['warnings']]
-            for result in warning_files[:5]:  # Show first 5
-                print(f"  📄 {result['file']}")
-                for warning in result['warnings']:
-                    print(f"    ⚠️  {warning}")
-            
-            if len(warning_files) > 5:
-                print(f"    ... and {len(warning_files) - 5} more files with warnings")
-        
-        print(f"\n{'=' * 50}")
-        
-        if summary['invalid_files'] == 0:
-            print("🎉 All JSON files are valid!")
-        else:
-            print(f"🔧 {summary['invalid_files']} files need attention")
+        if len(warning_files) > 5:
+            lines.append(f"    ... and {len(warning_files) - 5} more files with warnings")
+    
+    lines.append(f"\n{'=' * 50}")
+    
+    if summary['invalid_files'] == 0:
+        lines.append("🎉 All JSON files are valid!")
+    else:
+        lines.append(f"🔧 {summary['invalid_files']} files need attention")
+    
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 def main():
     """Main validation function."""
-    if len(sys.argv) > 1:
-        directory = sys.argv[1]
-    else:
-        directory = "."
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Validate generated RFID JSON files')
+    parser.add_argument('directory', nargs='?', default='.',
+                       help='Directory to validate (default: current directory)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                       help='Number of worker processes (default: CPU count)')
+    
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    directory = args.directory
     
     if not Path(directory).exists():
         print(f"Error: Directory '{directory}' does not exist")
         sys.exit(1)
     
-    validator = RFIDJsonValidator()
-    summary = validator.validate_directory(directory)
-    validator.print_validation_report(summary)
+    summary = validate_directory(directory, args.jobs)
+    print_validation_report(summary)
     
     # Set exit code based on validation results
     if summary['invalid_files'] > 0:
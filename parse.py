@@ -228,6 +228,20 @@ class Tag():
 
         return result[:-1]
 
+    def to_dict(self):
+        """Return the fields as formatted by __str__, for JSON output."""
+        result = {}
+        for key in self.data:
+            if type(self.data[key]) == dict:
+                result[key] = {tkey: str(self.data[key][tkey]) for tkey in self.data[key]}
+            else:
+                result[key] = bytes_to_hex(self.data[key]) if type(self.data[key]) == bytes else str(self.data[key])
+
+        if len(self.warnings):
+            result["Warnings"] = list(self.warnings)
+
+        return result
+
     def print_blocks(self, blocks_to_output = IMPORTANT_BLOCKS):
         for b in range(len(self.blocks)):
             if b not in blocks_to_output:
@@ -252,9 +266,13 @@ def load_data(files_to_load, silent = False):
     for filename in files_to_load:
         try:
             filepath = Path(filename)
-            with open(filepath, "rb") as f:
-                newdata = Tag(filepath, f.read())
-                data.append(newdata)
+            if filename == "-":
+                # Read the dump from stdin, e.g. when piped from another tool
+                newdata = Tag(filepath, sys.stdin.buffer.read())
+            else:
+                with open(filepath, "rb") as f:
+                    newdata = Tag(filepath, f.read())
+            data.append(newdata)
         except TagLengthMismatchError:
             if not silent: print(f"{filepath} not a valid tag, skipping")
 
@@ -271,6 +289,31 @@ def print_data(data, print_comparisons):
             tag.compare(data[i-1])
             print()
 
+def print_json(data):
+    # One JSON object per line (JSON Lines), in the same order as the input files
+    for tag in data:
+        print(json.dumps(tag.to_dict(), ensure_ascii=False))
+
+def parse_batch():
+    # Parse one filename per line from stdin, answering each with one line of JSON:
+    # the tag fields, {} if the file isn't a valid tag, or null if it can't be read or decoded
+    for line in sys.stdin:
+        filename = line.rstrip("\n")
+        try:
+            data = load_data([filename], silent=True)
+            result = data[0].to_dict() if data else {}
+        except Exception:
+            # Covers data that can't be decoded (e.g. a bad string or date) as well as
+            # unreadable files, so one bad dump doesn't stop the files after it
+            result = None
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
 if __name__ == "__main__":
-    data = load_data(sys.argv[1:])
-    print_data(data, False)
+    args = sys.argv[1:]
+    if "--batch" in args:
+        parse_batch()
+    elif "--output=json" in args:
+        print_json(load_data([arg for arg in args if arg != "--output=json"], silent=True))
+    else:
+        data = load_data(args)
+        print_data(data, False)